@@ -0,0 +1,163 @@
+"""
+Bulk question answering for regression-testing prompts and safety rules.
+
+Input is JSONL, one item per line: {"id": "...", "message": "...", "history": [...]}
+("id" and "history" are optional). Output is JSONL, streamed as items finish.
+
+Usage:
+    python batch_eval.py questions.jsonl -o answers.jsonl --concurrency 8
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+from embedding_cache import normalize_text
+from llm_gateway import GatewayOverloaded, PRIORITY_BATCH
+from resilience import DependencyUnavailable
+
+
+class SharedWork:
+    """
+    Runs each keyed computation once per batch; concurrent callers with the
+    same key wait for the first one and share its result (or exception).
+    Retryable failures (gateway overload, unavailable dependency) are not
+    kept, so the next caller after a backoff computes the value again.
+    """
+
+    RETRYABLE = (GatewayOverloaded, DependencyUnavailable)
+
+    def __init__(self):
+        self._futures = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.reused = 0
+
+    def get_or_compute(self, key, fn):
+        with self._lock:
+            future = self._futures.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[key] = future
+                self.computed += 1
+            else:
+                self.reused += 1
+
+        if owner:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                if isinstance(e, self.RETRYABLE):
+                    with self._lock:
+                        if self._futures.get(key) is future:
+                            del self._futures[key]
+                future.set_exception(e)
+        return future.result()
+
+
+def history_text(history):
+    return "".join(f"{msg}\n" for msg in history)
+
+
+def _answer(responder, item, shared, retries):
+    """Answer one item, backing off when the LLM gateway is saturated."""
+    for attempt in range(retries + 1):
+        try:
+            return responder.generate_response(
+                item["message"], history_text(item.get("history", [])),
+                shared=shared, priority=PRIORITY_BATCH,
+            )
+        except GatewayOverloaded as e:
+            if attempt == retries:
+                raise
+            time.sleep(e.retry_after)
+
+
+def run_batch(responder, items, concurrency=8, retries=3):
+    """
+    Answers items with bounded parallelism and yields one result dict per item,
+    in completion order. Identical (message, history) items are answered once;
+    different items share retrieval, web search and classification work.
+    """
+    shared = SharedWork()
+    groups = {}
+    for index, item in enumerate(items):
+        key = (normalize_text(item["message"]), tuple(item.get("history", [])))
+        groups.setdefault(key, []).append(index)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    try:
+        futures = {}
+        for indices in groups.values():
+            item = items[indices[0]]
+            future = executor.submit(_timed, _answer, responder, item, shared, retries)
+            futures[future] = indices
+
+        for future in as_completed(futures):
+            try:
+                response, seconds = future.result()
+                outcome = {"response": response, "seconds": round(seconds, 3)}
+            except Exception as e:
+                outcome = {"error": f"{type(e).__name__}: {str(e)}"}
+            for index in futures[future]:
+                yield {
+                    "index": index,
+                    "id": items[index].get("id", index),
+                    "message": items[index]["message"],
+                    **outcome,
+                }
+    finally:
+        # If the consumer stops early (e.g. the /ask/batch client disconnected),
+        # queued items are dropped and only the ones already running finish
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    print(f"✅ Batch done: {len(items)} items, {len(groups)} unique, "
+          f"{shared.computed} shared calls made, {shared.reused} reused", file=sys.stderr)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def read_items(lines):
+    items = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        item = json.loads(line)
+        if not isinstance(item.get("message"), str):
+            raise ValueError(f"Line {line_no}: 'message' must be a string")
+        items.append(item)
+    return items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in bulk.")
+    parser.add_argument("input", help="JSONL file of questions, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    from pdf_loader import load_pdf_embeddings
+    from llm_engine import LLMResponder
+
+    load_dotenv()
+    with (sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")) as f:
+        items = read_items(f)
+    responder = LLMResponder(load_pdf_embeddings())
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for result in run_batch(responder, items, concurrency=args.concurrency):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
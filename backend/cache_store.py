@@ -0,0 +1,368 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Bump to invalidate every cached value at once (e.g. after a prompt change)
+CACHE_VERSION = os.getenv("CACHE_VERSION", "1")
+
+
+class LocalLRU:
+    """In-process front tier: a small thread-safe LRU with per-entry expiry."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class SQLiteBackend:
+    """
+    Shared back tier for workers on one host: a SQLite database in WAL mode,
+    so readers in every worker don't block the writer.
+    """
+
+    def __init__(self, path="cache.db"):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _conn(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl),
+        )
+        self._sets += 1
+        if self._sets % 1000 == 0:
+            self.purge_expired()
+
+    def add_if_absent(self, key, value, ttl):
+        """Sets key only if it is missing or expired; returns True if it was set."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, now + ttl),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+        self._conn().execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+
+class RedisBackend:
+    """
+    Shared back tier across nodes. Works with any client exposing the Redis
+    get/set(ex=, nx=)/delete methods: redis-py, or LocalRedis for development.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        self.client.set(key, value, ex=max(1, int(ttl)))
+
+    def add_if_absent(self, key, value, ttl):
+        return bool(self.client.set(key, value, ex=max(1, int(ttl)), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+class LocalRedis:
+    """In-process stand-in for a Redis client, for development without a server."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[1] is not None and entry[1] < time.time():
+                self._data.pop(key, None)
+                return None
+            return entry[0]
+
+    def set(self, key, value, ex=None, nx=False):
+        with self._lock:
+            entry = self._data.get(key)
+            if nx and entry is not None and (entry[1] is None or entry[1] >= time.time()):
+                return None
+            self._data[key] = (value, time.time() + ex if ex else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) is not None else 0
+
+
+class TwoTierCache:
+    """
+    A namespaced cache with an in-process LRU in front of a shared backend.
+    Keys are versioned, values are stored as JSON, and get_or_compute lets only
+    one caller across all workers compute a missing value while the others wait.
+    """
+
+    def __init__(self, namespace, backend, ttl=3600, front_size=1024, version=CACHE_VERSION,
+                 lock_ttl=30.0):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self.version = version
+        self.lock_ttl = lock_ttl
+        self.front = LocalLRU(front_size)
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self.front_hits = 0
+        self.back_hits = 0
+        self.misses = 0
+
+    def make_key(self, key):
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{self.namespace}:v{self.version}:{digest}"
+
+    def get(self, key):
+        full_key = self.make_key(key)
+        value = self.front.get(full_key)
+        if value is not None:
+            self.front_hits += 1
+            return value
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(full_key)
+                # A corrupt entry is a miss; the next set overwrites it
+                value = json.loads(raw) if raw is not None else None
+            except Exception as e:
+                print(f"⚠️ Cache backend read failed: {str(e)}")
+                value = None
+            if value is not None:
+                self.front.set(full_key, value, self.ttl)
+                self.back_hits += 1
+                return value
+        return None
+
+    def set(self, key, value, ttl=None):
+        ttl = ttl or self.ttl
+        full_key = self.make_key(key)
+        self.front.set(full_key, value, ttl)
+        if self.backend is not None:
+            try:
+                self.backend.set(full_key, json.dumps(value), ttl)
+            except Exception as e:
+                print(f"⚠️ Cache backend write failed: {str(e)}")
+
+    def _key_lock(self, full_key):
+        with self._key_locks_lock:
+            return self._key_locks.setdefault(full_key, threading.Lock())
+
+    def get_or_compute(self, key, fn, ttl=None, lock_ttl=None, max_wait=None):
+        """
+        Returns the cached value, or computes, stores and returns it.
+        Threads in this process share one lock per key; across processes a
+        short-lived lock entry in the backend elects one computer and the rest
+        poll for its result while that lock is held. lock_ttl (default: the
+        cache's) is how long this call's computation may hold the lock.
+        Waiting stops after max_wait seconds (default lock_ttl), so callers
+        with a deadline pass the time they have left; then they compute themselves.
+        Exceptions and empty results (None, "", []) are not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_ttl = self.lock_ttl if lock_ttl is None else lock_ttl
+        wait_until = time.monotonic() + (lock_ttl if max_wait is None else max_wait)
+        full_key = self.make_key(key)
+        key_lock = self._key_lock(full_key)
+        have_key_lock = key_lock.acquire(timeout=max(0.0, wait_until - time.monotonic()))
+        try:
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            locked = False
+            if have_key_lock and self.backend is not None:
+                locked = self._acquire_backend_lock(full_key, lock_ttl)
+                if not locked:
+                    value = self._wait_for_value(key, full_key, wait_until)
+                    if value is not None:
+                        return value
+
+            self.misses += 1
+            try:
+                value = fn()
+                if value:
+                    self.set(key, value, ttl)
+                return value
+            finally:
+                if locked:
+                    self._release_backend_lock(full_key)
+        finally:
+            if have_key_lock:
+                key_lock.release()
+            with self._key_locks_lock:
+                if not key_lock.locked():
+                    self._key_locks.pop(full_key, None)
+
+    def _acquire_backend_lock(self, full_key, lock_ttl):
+        try:
+            return self.backend.add_if_absent(f"lock:{full_key}", b"1", lock_ttl)
+        except Exception as e:
+            print(f"⚠️ Cache lock failed: {str(e)}")
+            return True
+
+    def _release_backend_lock(self, full_key):
+        try:
+            self.backend.delete(f"lock:{full_key}")
+        except Exception:
+            pass
+
+    def _backend_lock_held(self, full_key):
+        try:
+            return self.backend.get(f"lock:{full_key}") is not None
+        except Exception:
+            return False
+
+    def _wait_for_value(self, key, full_key, wait_until):
+        delay = 0.05
+        while True:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            value = self.get(key)
+            if value is not None:
+                return value
+            if not self._backend_lock_held(full_key):
+                # The other worker failed or got an empty result; its value may
+                # also have landed just before the lock was released
+                return self.get(key)
+            delay = min(delay * 2, 1.0)
+
+    def stats(self):
+        lookups = self.front_hits + self.back_hits + self.misses
+        return {
+            "front_hits": self.front_hits,
+            "back_hits": self.back_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.front_hits + self.back_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_caches = {}
+
+
+def build_cache_backend(spec=None):
+    """
+    CACHE_BACKEND selects the shared tier: "sqlite" (default, CACHE_PATH file),
+    "redis://..." for a Redis server, "local-redis" for the in-process stand-in,
+    or "none" for front-tier only.
+    """
+    spec = spec or os.getenv("CACHE_BACKEND", "sqlite")
+    if spec == "none":
+        return None
+    if spec == "sqlite":
+        return SQLiteBackend(os.getenv("CACHE_PATH", "cache.db"))
+    if spec == "local-redis":
+        return RedisBackend(LocalRedis())
+    if spec.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend.from_url(spec)
+    raise ValueError(f"Unknown CACHE_BACKEND: {spec}")
+
+
+def version_of(*parts):
+    """Short hash of what cached values depend on, e.g. a model name and prompt text."""
+    return hashlib.sha1("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:12]
+
+
+def get_cache(namespace, ttl=3600, depends_on=()):
+    """
+    The process-wide cache for a namespace; all namespaces share one backend.
+    depends_on (model names, prompt templates, ...) is hashed into the key
+    version, so changing any of them never serves values computed under the old ones.
+    """
+    global _backend
+    version = f"{CACHE_VERSION}-{version_of(*depends_on)}" if depends_on else CACHE_VERSION
+    with _backend_lock:
+        if (namespace, version) not in _caches:
+            if _backend is None and not _caches:
+                try:
+                    _backend = build_cache_backend()
+                except Exception as e:
+                    print(f"⚠️ Shared cache unavailable, using in-process cache only: {str(e)}")
+            _caches[(namespace, version)] = TwoTierCache(
+                namespace,
+                _backend,
+                ttl=float(os.getenv(f"CACHE_TTL_{namespace.upper()}", ttl)),
+                version=version,
+            )
+        return _caches[(namespace, version)]
+
+
+def cache_stats():
+    with _backend_lock:
+        return {f"{namespace}:v{version}": cache.stats() for (namespace, version), cache in _caches.items()}
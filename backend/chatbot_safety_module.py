@@ -1,16 +1,36 @@
+import os
 import re
 import numpy as np
 from transformers import AutoTokenizer, AutoModel
 import torch
+from filelock import FileLock
+
+class TokenizedText:
+    """
+    Lowercased text and word tokens computed once and shared by every checker.
+    """
+    
+    __slots__ = ("text", "lower", "words", "word_set")
+    
+    def __init__(self, text):
+        self.text = text
+        self.lower = text.lower()
+        self.words = re.findall(r'\b\w+\b', self.lower)
+        self.word_set = set(self.words)
+
 
 class GenderBiasMitigation:
     """
     A class to detect and mitigate gender bias in language model outputs.
     """
     
-    def __init__(self, model_name="bert-base-uncased"):
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModel.from_pretrained(model_name)
+    def __init__(self, model_name="bert-base-uncased", direction_path=None, embedding_scorer=None):
+        self.model_name = model_name
+        self.direction_path = direction_path
+        self.tokenizer = None
+        self.model = None
+        # Optional EmbeddingBiasScorer; built once the gender direction is known
+        self.embedding_scorer = None
         
         # Define gender word pairs for bias detection
         self.gender_pairs = [
@@ -27,12 +47,45 @@ class GenderBiasMitigation:
             "feminine_coded": ["nurse", "teacher", "assistant", "secretary", "homemaker"]
         }
         
+        self._masculine_coded = set(self.stereotypical_associations["masculine_coded"])
+        self._feminine_coded = set(self.stereotypical_associations["feminine_coded"])
+        
         # Load gender direction in embedding space (simplified version)
         # In production, use a more sophisticated approach for the gender direction
-        self.gender_direction = self._compute_gender_direction()
+        self.gender_direction = self._load_gender_direction()
+        if embedding_scorer is not None:
+            self.embedding_scorer = embedding_scorer(self.gender_direction)
+    
+    def _load_gender_direction(self):
+        """
+        Load the cached gender direction if available, otherwise compute it.
+        With a cache file, workers never load BERT just to rebuild one vector.
+        """
+        if not self.direction_path:
+            return self._compute_gender_direction()
+        if os.path.exists(self.direction_path):
+            return np.load(self.direction_path)
+        
+        # Only one worker loads BERT; the others wait and then read its file
+        os.makedirs(os.path.dirname(os.path.abspath(self.direction_path)), exist_ok=True)
+        with FileLock(self.direction_path + ".lock"):
+            if os.path.exists(self.direction_path):
+                return np.load(self.direction_path)
+            direction = self._compute_gender_direction()
+            tmp_path = f"{self.direction_path}.{os.getpid()}.tmp.npy"
+            np.save(tmp_path, direction)
+            os.replace(tmp_path, self.direction_path)
+        # Only the direction is needed afterwards; free BERT so this worker matches the others
+        self.tokenizer = None
+        self.model = None
+        return direction
     
     def _compute_gender_direction(self):
         """Compute gender direction in embedding space using gendered word pairs."""
+        if self.model is None:
+            self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            self.model = AutoModel.from_pretrained(self.model_name)
+        
         gender_vectors = []
         
         for male, female in self.gender_pairs:
@@ -48,40 +101,60 @@ class GenderBiasMitigation:
         # Average the gender directions
         return np.mean(gender_vectors, axis=0)
     
-    def detect_gender_bias(self, text):
+    def detect_gender_bias(self, text, tokens=None):
         """
         Detects potential gender bias in text.
         Returns a dict with bias scores and flagged issues.
         """
-        results = {
-            "bias_score": 0.0,
-            "stereotypical_associations": [],
-            "gendered_language": [],
-            "needs_review": False
-        }
-        
-        # Check for stereotypical associations
-        words = re.findall(r'\b\w+\b', text.lower())
+        return self.detect_gender_bias_batch([tokens or TokenizedText(text)])[0]
+    
+    def detect_gender_bias_batch(self, tokenized_texts):
+        """
+        Detects gender bias for a list of TokenizedText in one pass.
+        Scores are computed for the whole batch at once in integer units of
+        0.05 (0.2 = 4, 0.15 = 3), so threshold comparisons are exact.
+        """
+        findings = []
+        counts = np.zeros((len(tokenized_texts), 2), dtype=np.int64)
         
-        for word in words:
-            if word in self.stereotypical_associations["masculine_coded"]:
-                results["stereotypical_associations"].append(f"Masculine-coded term: {word}")
-                results["bias_score"] += 0.2
+        for i, tokens in enumerate(tokenized_texts):
+            associations = []
+            # Check for stereotypical associations
+            for word in tokens.words:
+                if word in self._masculine_coded:
+                    associations.append(f"Masculine-coded term: {word}")
+                if word in self._feminine_coded:
+                    associations.append(f"Feminine-coded term: {word}")
             
-            if word in self.stereotypical_associations["feminine_coded"]:
-                results["stereotypical_associations"].append(f"Feminine-coded term: {word}")
-                results["bias_score"] += 0.2
-        
-        # Check for gendered language when unnecessary
-        for male, female in self.gender_pairs:
-            if male in words and female not in text.lower():
-                results["gendered_language"].append(f"Potentially unnecessary gendered term: {male}")
-                results["bias_score"] += 0.15
+            # Check for gendered language when unnecessary
+            gendered = [
+                f"Potentially unnecessary gendered term: {male}"
+                for male, female in self.gender_pairs
+                if male in tokens.word_set and female not in tokens.lower
+            ]
+            findings.append((associations, gendered))
+            counts[i] = (len(associations), len(gendered))
         
+        units = counts @ np.array([4, 3])
         # Flag for review if bias score exceeds threshold
-        if results["bias_score"] > 0.5:
-            results["needs_review"] = True
-            
+        needs_review = units > 10
+        
+        results = [
+            {
+                "bias_score": float(units[i]) / 20,
+                "stereotypical_associations": associations,
+                "gendered_language": gendered,
+                "needs_review": bool(needs_review[i])
+            }
+            for i, (associations, gendered) in enumerate(findings)
+        ]
+        
+        # Embedding-based score is reported alongside; it doesn't change decisions
+        if self.embedding_scorer is not None:
+            scores = self.embedding_scorer.score_batch([t.text for t in tokenized_texts])
+            for result, score in zip(results, scores):
+                result.update(score)
+        
         return results
     
     def mitigate_gender_bias(self, text):
@@ -132,10 +205,11 @@ class SafetyGuardrails:
             "reproductive", "pregnancy", "birth control"
         ]
     
-    def check_content(self, user_input, response_text):
+    def check_content(self, user_input, response_text, combined_lower=None):
         """
         Checks both user input and potential response for safety issues.
         Returns dict with safety flags and any needed resources.
+        combined_lower may be passed when the lowercased text is already known.
         """
         results = {
             "sensitive_topics_detected": [],
@@ -145,7 +219,9 @@ class SafetyGuardrails:
             "modified_response": response_text
         }
         
-        combined_text = (user_input + " " + response_text).lower()
+        if combined_lower is None:
+            combined_lower = (user_input + " " + response_text).lower()
+        combined_text = combined_lower
         
         # Check for sensitive topics
         for topic in self.sensitive_topics:
@@ -219,7 +295,7 @@ class InclusiveLanguageChecker:
             "girls": ["women", "adults"] # When referring to adult women
         }
     
-    def check_text(self, text):
+    def check_text(self, text, tokens=None):
         """
         Checks text for non-inclusive language and suggests alternatives.
         Returns the original text and a list of suggestions.
@@ -230,23 +306,25 @@ class InclusiveLanguageChecker:
         }
         
         # Convert to lowercase for checking but keep original for display
-        text_lower = text.lower()
+        text_lower = tokens.lower if tokens is not None else text.lower()
         
         for term, alternatives in self.term_alternatives.items():
             if term in text_lower:
                 suggestion = {
                     "term": term,
                     "alternatives": alternatives,
-                    "context": self._get_context(text, term)
+                    "context": self._get_context(text, term, text_lower)
                 }
                 results["suggestions"].append(suggestion)
         
         return results
     
-    def _get_context(self, text, term):
+    def _get_context(self, text, term, text_lower=None):
         """Extract a snippet of text containing the term for context."""
         # Find the term in the text (case insensitive)
-        term_index = text.lower().find(term.lower())
+        if text_lower is None:
+            text_lower = text.lower()
+        term_index = text_lower.find(term.lower())
         if term_index == -1:
             return ""
         
@@ -263,12 +341,14 @@ class InclusiveLanguageChecker:
             
         return context
     
-    def suggest_improvements(self, text):
+    def suggest_improvements(self, text, check_results=None):
         """
         Suggests an improved version of the text with more inclusive language.
+        Pass the result of check_text to avoid checking the text twice.
         """
         improved_text = text
-        check_results = self.check_text(text)
+        if check_results is None:
+            check_results = self.check_text(text)
         
         for suggestion in check_results["suggestions"]:
             term = suggestion["term"]
@@ -295,8 +375,20 @@ class InclusiveLanguageChecker:
 
 # Example of using all components together in a chatbot pipeline
 class WomenFocusedChatbotSafety:
-    def __init__(self, base_model_name="bert-base-uncased"):
-        self.bias_mitigator = GenderBiasMitigation(model_name=base_model_name)
+    def __init__(self, base_model_name="bert-base-uncased", gender_direction_path=None,
+                 onnx_model_dir=None):
+        embedding_scorer = None
+        if onnx_model_dir:
+            # onnxruntime is only imported when the ONNX scorer is enabled
+            from onnx_bias_scorer import EmbeddingBiasScorer, OnnxSentenceEncoder
+            encoder = OnnxSentenceEncoder(onnx_model_dir)
+            embedding_scorer = lambda direction: EmbeddingBiasScorer(encoder, direction)
+        
+        self.bias_mitigator = GenderBiasMitigation(
+            model_name=base_model_name,
+            direction_path=gender_direction_path,
+            embedding_scorer=embedding_scorer,
+        )
         self.safety_guardrails = SafetyGuardrails()
         self.inclusive_checker = InclusiveLanguageChecker()
         
@@ -308,30 +400,59 @@ class WomenFocusedChatbotSafety:
         Process a user message and chatbot response through all safety systems.
         Returns a safer, more inclusive, and less biased response.
         """
-        # Step 1: Check for gender bias in the raw response
-        bias_results = self.bias_mitigator.detect_gender_bias(raw_response)
-        
-        # Step 2: Mitigate any gender bias if score is significant
-        processed_response = raw_response
-        if bias_results["bias_score"] > 0.3:
-            processed_response = self.bias_mitigator.mitigate_gender_bias(raw_response)
-        
-        # Step 3: Check for inclusive language
-        inclusive_check = self.inclusive_checker.check_text(processed_response)
-        if inclusive_check["suggestions"]:
-            processed_response = self.inclusive_checker.suggest_improvements(processed_response)
-        
-        # Step 4: Apply safety guardrails
-        safety_results = self.safety_guardrails.check_content(user_input, processed_response)
-        final_response = safety_results["modified_response"]
-        
-        # Return both the processed response and the safety/bias analytics
-        return {
-            "final_response": final_response,
-            "bias_analysis": bias_results,
-            "safety_analysis": safety_results,
-            "inclusive_language_analysis": inclusive_check["suggestions"]
-        }
+        return self.process_batch([user_input], [raw_response])[0]
+    
+    def process_batch(self, user_inputs, raw_responses):
+        """
+        Process many responses at once (bulk evaluation, streamed partial chunks).
+        user_inputs is a list matching raw_responses, or one string used for all.
+        Each distinct text is lowercased and tokenized once, and bias scoring
+        runs over the whole batch together.
+        """
+        if isinstance(user_inputs, str):
+            user_inputs = [user_inputs] * len(raw_responses)
+        
+        token_cache = {}
+        def tokenize(text):
+            if text not in token_cache:
+                token_cache[text] = TokenizedText(text)
+            return token_cache[text]
+        
+        # Step 1: Check for gender bias in the raw responses
+        response_tokens = [tokenize(r) for r in raw_responses]
+        all_bias_results = self.bias_mitigator.detect_gender_bias_batch(response_tokens)
+        
+        results = []
+        for user_input, tokens, bias_results in zip(user_inputs, response_tokens, all_bias_results):
+            # Step 2: Mitigate any gender bias if score is significant
+            processed_response = tokens.text
+            if bias_results["bias_score"] > 0.3:
+                processed_response = self.bias_mitigator.mitigate_gender_bias(processed_response)
+            processed_tokens = tokenize(processed_response)
+            
+            # Step 3: Check for inclusive language
+            inclusive_check = self.inclusive_checker.check_text(processed_response, processed_tokens)
+            if inclusive_check["suggestions"]:
+                processed_response = self.inclusive_checker.suggest_improvements(
+                    processed_response, inclusive_check
+                )
+                processed_tokens = tokenize(processed_response)
+            
+            # Step 4: Apply safety guardrails
+            combined_lower = tokenize(user_input).lower + " " + processed_tokens.lower
+            safety_results = self.safety_guardrails.check_content(
+                user_input, processed_response, combined_lower
+            )
+            
+            # Return both the processed response and the safety/bias analytics
+            results.append({
+                "final_response": safety_results["modified_response"],
+                "bias_analysis": bias_results,
+                "safety_analysis": safety_results,
+                "inclusive_language_analysis": inclusive_check["suggestions"]
+            })
+        
+        return results
 
 
 # Example usage
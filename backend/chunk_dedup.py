@@ -0,0 +1,94 @@
+import re
+import mmh3
+import numpy as np
+
+# Mersenne prime used for the universal hash family (a * x + b) mod p
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHashDeduplicator:
+    """
+    Detects near-duplicate text chunks (repeated front matter, copyright pages,
+    running headers) using MinHash signatures and LSH banding, so only one copy
+    of each passage gets embedded and indexed.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=128, bands=16, shingle_size=5, seed=1):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        # Keep a below 2**31 so a * hash (hash < 2**32) + b cannot overflow uint64
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text):
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)}
+        return {
+            " ".join(words[i:i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signature(self, text):
+        """MinHash signature of the text's word shingles."""
+        hashes = np.array(
+            [mmh3.hash(s, signed=False) for s in self._shingles(text)],
+            dtype=np.uint64,
+        )
+        # Permute every shingle hash under every hash function, keep the minimum
+        permuted = (np.outer(hashes, self._a) + self._b) % _PRIME
+        return np.min(permuted, axis=0) & _MAX_HASH
+
+    def deduplicate(self, chunks):
+        """
+        Removes near-duplicate chunks, keeping the first occurrence.
+        Returns (kept_chunks, stats).
+        """
+        buckets = {}
+        signatures = []
+        kept = []
+        removed = 0
+        removed_chars = 0
+
+        for chunk in chunks:
+            sig = self.signature(chunk)
+            band_keys = [
+                (b, sig[b * self.rows:(b + 1) * self.rows].tobytes())
+                for b in range(self.bands)
+            ]
+
+            candidates = set()
+            for key in band_keys:
+                candidates.update(buckets.get(key, ()))
+
+            is_duplicate = any(
+                np.mean(signatures[c] == sig) >= self.threshold for c in candidates
+            )
+            if is_duplicate:
+                removed += 1
+                removed_chars += len(chunk)
+                continue
+
+            idx = len(kept)
+            kept.append(chunk)
+            signatures.append(sig)
+            for key in band_keys:
+                buckets.setdefault(key, []).append(idx)
+
+        total = len(chunks)
+        stats = {
+            "input_chunks": total,
+            "kept_chunks": len(kept),
+            "removed_chunks": removed,
+            "removed_ratio": round(removed / total, 4) if total else 0.0,
+            "removed_chars": removed_chars,
+        }
+        return kept, stats
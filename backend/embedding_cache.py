@@ -0,0 +1,172 @@
+import atexit
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_text(text):
+    """Normalize text so trivially different inputs share one cache entry."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    A bounded, thread-safe LRU cache in front of an embeddings model.
+    Repeated queries (e.g. the /suggestions prompts) are served from memory
+    instead of calling the embedding API again. Queries and documents are
+    cached separately since the model embeds them with different task types.
+    """
+
+    def __init__(self, embedder, max_size=10000, persist_path=None, shared_cache=None):
+        self.embedder = embedder
+        # Optional TwoTierCache consulted on local misses, shared by all workers
+        self.shared_cache = shared_cache
+        self.max_size = max_size
+        self.persist_path = persist_path
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.texts_embedded = 0
+
+        if persist_path:
+            self.load()
+            atexit.register(self.save)
+
+    def _get(self, key):
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+        return vector
+
+    def _put(self, key, vector):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def embed_documents(self, texts):
+        keys = ["doc:" + normalize_text(t) for t in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._get(key)
+                if vector is not None:
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    # Duplicates inside one batch are embedded only once
+                    if key not in missing:
+                        self.misses += 1
+                    else:
+                        self.hits += 1
+                    missing.setdefault(key, []).append(i)
+
+        if missing and self.shared_cache is not None:
+            for key in list(missing):
+                vector = self.shared_cache.get(key)
+                if vector is not None:
+                    with self._lock:
+                        self.hits += 1
+                        self.misses -= 1
+                        self._put(key, vector)
+                    for i in missing.pop(key):
+                        results[i] = vector
+
+        if missing:
+            miss_keys = list(missing)
+            first_texts = [texts[missing[k][0]] for k in miss_keys]
+            vectors = self.embedder.embed_documents(first_texts)
+            with self._lock:
+                self.api_calls += 1
+                self.texts_embedded += len(miss_keys)
+                for key, vector in zip(miss_keys, vectors):
+                    self._put(key, vector)
+                    for i in missing[key]:
+                        results[i] = vector
+            if self.shared_cache is not None:
+                for key, vector in zip(miss_keys, vectors):
+                    self.shared_cache.set(key, vector)
+
+        return results
+
+    def embed_query(self, text):
+        key = "query:" + normalize_text(text)
+        with self._lock:
+            vector = self._get(key)
+            if vector is not None:
+                self.hits += 1
+                return vector
+            self.misses += 1
+
+        if self.shared_cache is not None:
+            vector = self.shared_cache.get(key)
+            if vector is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.misses -= 1
+                    self._put(key, vector)
+                return vector
+
+        vector = self.embedder.embed_query(text)
+        with self._lock:
+            self.api_calls += 1
+            self.texts_embedded += 1
+            self._put(key, vector)
+        if self.shared_cache is not None:
+            self.shared_cache.set(key, vector)
+        return vector
+
+    def stats(self):
+        """
+        Returns hit ratio, and texts embedded vs texts served from cache.
+        api_calls counts requests to the model; one batch embeds many texts.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "api_calls": self.api_calls,
+                "texts_embedded": self.texts_embedded,
+                "texts_saved": self.hits,
+            }
+
+    def load(self):
+        """Load cached vectors from persist_path, if it exists."""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            with self._lock:
+                for key, vector in entries:
+                    self._put(key, vector)
+            print(f"✅ Loaded {len(self._cache)} cached embeddings from {self.persist_path}")
+        except Exception as e:
+            print(f"⚠️ Failed to load embedding cache: {str(e)}")
+
+    def save(self):
+        """Write cached vectors to persist_path, oldest first to keep LRU order."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries = list(self._cache.items())
+        # Every worker saves at exit, so each writes its own temporary file
+        tmp_path = f"{self.persist_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"⚠️ Failed to save embedding cache: {str(e)}")
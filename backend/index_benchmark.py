@@ -0,0 +1,77 @@
+"""
+Recall vs latency vs memory benchmark of the FAISS index types in vector_index
+against the flat (exact) baseline.
+
+Usage:
+    python index_benchmark.py --num-vectors 100000 --dim 768 --queries 500
+"""
+import argparse
+import time
+import numpy as np
+
+from vector_index import INDEX_TYPES, build_faiss_index, index_memory_bytes
+
+
+def make_corpus(num_vectors, dim, num_queries, num_clusters=100, seed=0):
+    """
+    Clustered random vectors, which behave more like real embeddings than uniform
+    noise. Queries are held-out rows drawn around the same cluster centers, so
+    they have real nearest neighbours in the corpus.
+    """
+    rng = np.random.default_rng(seed)
+    total = num_vectors + num_queries
+    centers = rng.normal(size=(num_clusters, dim)).astype("float32")
+    labels = rng.integers(0, num_clusters, size=total)
+    noise = rng.normal(scale=0.3, size=(total, dim)).astype("float32")
+    vectors = centers[labels] + noise
+    return vectors[:num_vectors], vectors[num_vectors:]
+
+
+def run_benchmark(num_vectors, dim, num_queries, k=4):
+    corpus, queries = make_corpus(num_vectors, dim, num_queries)
+
+    results = []
+    ground_truth = None
+    for index_type in INDEX_TYPES:
+        start = time.perf_counter()
+        index = build_faiss_index(corpus, index_type=index_type)
+        index.add(corpus)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            _, ids = index.search(query.reshape(1, -1), k)
+        per_query_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+        _, ids = index.search(queries, k)
+        if ground_truth is None:
+            ground_truth = ids
+        recall = np.mean([
+            len(set(found) & set(expected)) / k
+            for found, expected in zip(ids, ground_truth)
+        ])
+
+        results.append({
+            "index": index_type,
+            "build_s": build_seconds,
+            "query_ms": per_query_ms,
+            f"recall@{k}": recall,
+            "memory_mb": index_memory_bytes(index) / 1e6,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--num-vectors", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"\nBenchmarking {args.num_vectors} x {args.dim} vectors, {args.queries} queries...\n")
+    rows = run_benchmark(args.num_vectors, args.dim, args.queries, k=args.k)
+    print(f"{'index':<8}{'build (s)':>12}{'query (ms)':>12}{'recall@' + str(args.k):>12}{'memory (MB)':>14}")
+    for row in rows:
+        print(f"{row['index']:<8}{row['build_s']:>12.2f}{row['query_ms']:>12.3f}"
+              f"{row['recall@' + str(args.k)]:>12.3f}{row['memory_mb']:>14.1f}")
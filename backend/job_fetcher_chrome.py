@@ -5,6 +5,12 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 import time
+from snapshots import save_snapshot_if_enabled
+from resilience import Deadline
+from cache_store import get_cache
+
+# Pause after the cards appear so late DOM updates land; always capped by the deadline
+SETTLE_SECONDS = 1.0
 
 # -------------------------------
 #  Helper: Create Chrome driver
@@ -24,22 +30,26 @@ def create_chrome_driver():
 # -------------------------------
 #  Job Fetching Function (Fixed Safari)
 # -------------------------------
-def fetch_herkey_jobs_safari_fixed(url):
+def fetch_herkey_jobs_safari_fixed(url, timeout=60):
+    # One deadline for the whole scrape, so the browser is gone once the budget is spent
+    deadline = Deadline(timeout)
     driver = create_chrome_driver()
-    driver.get(url)
 
     jobs = []
 
     try:
+        driver.set_page_load_timeout(max(deadline.remaining(), 0.1))
+        driver.get(url)
+
         # Before scraping, ensure full page load
-        WebDriverWait(driver, 30).until(lambda d: d.execute_script('return document.readyState') == 'complete')
+        WebDriverWait(driver, deadline.remaining()).until(lambda d: d.execute_script('return document.readyState') == 'complete')
         
         # Wait for specific element
-        WebDriverWait(driver, 60).until(
+        WebDriverWait(driver, deadline.remaining()).until(
             EC.visibility_of_element_located((By.CSS_SELECTOR, 'div[data-test-id="job-details"]'))
         )
         print(f"Job titles loaded successfully from {url}!")
-        time.sleep(5)
+        time.sleep(min(SETTLE_SECONDS, deadline.remaining()))  # short wait for late DOM updates
         job_cards = driver.find_elements(By.CSS_SELECTOR, 'div[data-test-id="job-details"]')
 
         for card in job_cards:
@@ -66,7 +76,8 @@ def fetch_herkey_jobs_safari_fixed(url):
                     "company": company_element.text.strip() if company_element else "N/A",
                     "location": location,
                     "work_type": work_type,
-                    "experience": experience
+                    "experience": experience,
+                    "source_url": url
                 }
                 jobs.append(job)
 
@@ -79,23 +90,27 @@ def fetch_herkey_jobs_safari_fixed(url):
     finally:
         driver.quit()
 
+    save_snapshot_if_enabled("jobs", jobs, source_url=url)
     return jobs
 
 # -------------------------------
 #  Event Fetching Function (Fixed Safari)
 # -------------------------------
-def fetch_herkey_featured_events_safari():
+def fetch_herkey_featured_events_safari(timeout=60):
+    deadline = Deadline(timeout)
     driver = create_chrome_driver()
-    driver.get("https://events.herkey.com/events/")
 
     events = []
 
     try:
-        WebDriverWait(driver, 60).until(
+        driver.set_page_load_timeout(max(deadline.remaining(), 0.1))
+        driver.get("https://events.herkey.com/events/")
+
+        WebDriverWait(driver, deadline.remaining()).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, 'div.card.event-details-card.mb-2.featured-events'))
         )
         print(f"Event titles loaded successfully from https://events.herkey.com/events/!")
-        time.sleep(3)
+        time.sleep(min(SETTLE_SECONDS, deadline.remaining()))
 
         event_cards = driver.find_elements(By.CSS_SELECTOR, 'div.card.event-details-card.mb-2.featured-events')
 
@@ -120,6 +135,7 @@ def fetch_herkey_featured_events_safari():
     finally:
         driver.quit()
 
+    save_snapshot_if_enabled("events", events, source_url="https://events.herkey.com/events/")
     return events
 
 # -------------------------------
@@ -131,13 +147,21 @@ def get_all_jobs():
 def get_work_from_home_jobs():
     return fetch_herkey_jobs_safari_fixed(url="https://www.herkey.com/jobs/search?work_mode=work-from-home")
 
-def get_jobs_by_keyword(keyword):
+def get_jobs_by_keyword(keyword, timeout=60):
     keyword = keyword.strip().lower().replace(' ', '-')
     search_url = f"https://www.herkey.com/jobs/search?keyword={keyword}"
-    return fetch_herkey_jobs_safari_fixed(url=search_url)
-
-def get_all_events():
-    return fetch_herkey_featured_events_safari()
+    # Shared across workers; only one of them scrapes a given search at a time
+    # The lock, and any wait for another worker's scrape, last only as long as this call's timeout
+    return get_cache("jobs", ttl=3600).get_or_compute(
+        search_url, lambda: fetch_herkey_jobs_safari_fixed(url=search_url, timeout=timeout),
+        lock_ttl=timeout, max_wait=timeout,
+    )
+
+def get_all_events(timeout=60):
+    return get_cache("events", ttl=3600).get_or_compute(
+        "featured", lambda: fetch_herkey_featured_events_safari(timeout=timeout),
+        lock_ttl=timeout, max_wait=timeout,
+    )
 
 # -------------------------------
 # Example usage:
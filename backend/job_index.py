@@ -0,0 +1,197 @@
+import bisect
+import re
+import threading
+import time
+
+
+def tokenize(text):
+    return re.findall(r"[a-z0-9+#.]+", (text or "").lower())
+
+
+def parse_experience(text):
+    """
+    Parses HerKey experience text into (min_years, max_years).
+    "2-5 Yrs" -> (2, 5), "3+ years" -> (3, None), "Fresher" -> (0, 0).
+    Returns (None, None) when no range can be found.
+    """
+    text = (text or "").lower()
+    if "fresher" in text:
+        return 0, 0
+    match = re.search(r"(\d+)\s*(?:-|to)\s*(\d+)", text)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = re.search(r"(\d+)\s*\+", text)
+    if match:
+        return int(match.group(1)), None
+    match = re.search(r"(\d+)", text)
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    return None, None
+
+
+class JobIndex:
+    """
+    In-memory inverted index over scraped job listings.
+    Title and company tokens support exact and prefix search; location and
+    work_type are facet filters; experience is filtered as a years range.
+    With a ttl, listings scraped longer ago than ttl seconds are dropped.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self._jobs = []
+        self._keys = {}
+        self._postings = {}
+        self._sorted_tokens = []
+        self._location_postings = {}
+        self._work_type_postings = {}
+        self._oldest = None
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def _expired(self, scraped_at, now):
+        return self.ttl is not None and now - scraped_at > self.ttl
+
+    def remove_expired(self):
+        """
+        Drops listings older than ttl. Doc ids are list positions, so the
+        survivors are re-indexed; this only runs once the oldest has expired.
+        Returns the number of listings removed.
+        """
+        now = time.time()
+        with self._lock:
+            if self._oldest is None or not self._expired(self._oldest, now):
+                return 0
+            kept = [job for job in self._jobs if not self._expired(job["scraped_at"], now)]
+            removed = len(self._jobs) - len(kept)
+            self._clear()
+            self.add_jobs(kept)
+            return removed
+
+    def add_jobs(self, jobs):
+        """Index a list of job dicts, replacing earlier copies of the same listing."""
+        now = time.time()
+        with self._lock:
+            new_tokens = False
+            for job in jobs:
+                # Listings restored from a snapshot may already be past the ttl
+                if self._expired(job.get("scraped_at", now), now):
+                    continue
+                key = (job.get("title", "").lower(), job.get("company", "").lower(),
+                       job.get("location", "").lower())
+                min_exp, max_exp = parse_experience(job.get("experience"))
+                # Listings restored from a snapshot keep their original scrape time
+                record = dict(job, min_experience=min_exp, max_experience=max_exp)
+                record.setdefault("scraped_at", now)
+                if self._oldest is None or record["scraped_at"] < self._oldest:
+                    self._oldest = record["scraped_at"]
+
+                if key in self._keys:
+                    # Same listing seen again: keep the newest copy, postings are unchanged
+                    doc_id = self._keys[key]
+                    if record["scraped_at"] >= self._jobs[doc_id]["scraped_at"]:
+                        self._jobs[doc_id] = record
+                    continue
+
+                doc_id = len(self._jobs)
+                self._keys[key] = doc_id
+                self._jobs.append(record)
+
+                for token in set(tokenize(job.get("title")) + tokenize(job.get("company"))):
+                    if token not in self._postings:
+                        self._postings[token] = set()
+                        new_tokens = True
+                    self._postings[token].add(doc_id)
+                for token in set(tokenize(job.get("location"))):
+                    self._location_postings.setdefault(token, set()).add(doc_id)
+                for token in set(tokenize(job.get("work_type"))):
+                    self._work_type_postings.setdefault(token, set()).add(doc_id)
+
+            if new_tokens:
+                self._sorted_tokens = sorted(self._postings)
+
+    def _match_token(self, token, prefix=True):
+        """Doc ids whose title/company has the token, or a token starting with it."""
+        if not prefix:
+            return set(self._postings.get(token, ()))
+        matches = set()
+        start = bisect.bisect_left(self._sorted_tokens, token)
+        for indexed in self._sorted_tokens[start:]:
+            if not indexed.startswith(token):
+                break
+            matches |= self._postings[indexed]
+        return matches
+
+    def _match_facet(self, postings, value):
+        ids = None
+        for token in tokenize(value):
+            matches = postings.get(token, set())
+            ids = matches if ids is None else ids & matches
+        return ids if ids is not None else set()
+
+    def search(self, query="", location=None, work_type=None, min_experience=None,
+               max_experience=None, max_age=None, page=1, page_size=10, prefix=True):
+        """
+        Returns a page of jobs matching every query token and every given filter,
+        newest first, plus facet counts over all matches. Query tokens match as
+        prefixes for search-as-you-type; prefix=False requires whole tokens.
+        """
+        if self.ttl is not None:
+            self.remove_expired()
+            max_age = self.ttl if max_age is None else min(max_age, self.ttl)
+        with self._lock:
+            ids = None
+            for token in tokenize(query):
+                matches = self._match_token(token, prefix)
+                ids = matches if ids is None else ids & matches
+            if ids is None:
+                ids = set(range(len(self._jobs)))
+
+            if location:
+                ids &= self._match_facet(self._location_postings, location)
+            if work_type:
+                ids &= self._match_facet(self._work_type_postings, work_type)
+
+            now = time.time()
+            results = []
+            for doc_id in ids:
+                job = self._jobs[doc_id]
+                if max_age is not None and now - job["scraped_at"] > max_age:
+                    continue
+                if not self._experience_overlaps(job, min_experience, max_experience):
+                    continue
+                results.append(job)
+
+        results.sort(key=lambda job: job["scraped_at"], reverse=True)
+        facets = {"location": {}, "work_type": {}}
+        for job in results:
+            for facet in facets:
+                value = job.get(facet, "N/A")
+                facets[facet][value] = facets[facet].get(value, 0) + 1
+
+        start = (page - 1) * page_size
+        return {
+            "total": len(results),
+            "page": page,
+            "page_size": page_size,
+            "jobs": results[start:start + page_size],
+            "facets": facets,
+        }
+
+    @staticmethod
+    def _experience_overlaps(job, min_experience, max_experience):
+        if min_experience is None and max_experience is None:
+            return True
+        job_min, job_max = job["min_experience"], job["max_experience"]
+        if job_min is None:
+            return False
+        if max_experience is not None and job_min > max_experience:
+            return False
+        if min_experience is not None and job_max is not None and job_max < min_experience:
+            return False
+        return True
@@ -2,17 +2,72 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import LLMChain
 from langchain.prompts import PromptTemplate
 from langchain_community.utilities import SerpAPIWrapper
+from serpapi import GoogleSearch
 from chatbot_safety_module import WomenFocusedChatbotSafety
 from guardrails import Guard
-from job_fetcher import get_jobs_by_keyword,fetch_herkey_featured_events_safari
+from job_index import JobIndex
+from embedding_cache import normalize_text
+from llm_gateway import LLMGateway, GatewayOverloaded, PRIORITY_INTERACTIVE, PRIORITY_CLASSIFICATION
+from snapshots import list_snapshots, load_snapshot, snapshot_dir, snapshot_time, to_records
+import time
+from job_fetcher import get_jobs_by_keyword,get_all_events
+from cache_store import get_cache
+import threading
+from resilience import (
+    CircuitBreaker, Deadline, DependencyUnavailable, DEFAULT_BUDGETS, call_with_budget, dependency_budget
+)
+import os
+
+def build_guard():
+    return Guard.from_rail("asha_guard.rail")
+
+# Gemini serves the final answer and the classification calls, so the client
+# default covers the largest of their budgets
+LLM_CALLS = ("llm", "keyword_extractor", "job_detector")
+
+def build_gemini_model():
+    # Client-side timeout and few retries, so calls abandoned at their budget actually end
+    return ChatGoogleGenerativeAI(
+        model="gemini-1.5-flash",
+        temperature=0,
+        timeout=max(dependency_budget(name) for name in LLM_CALLS),
+        max_retries=1,
+    )
+
+def gemini_request_options(name):
+    """Per-call options for a chain: the request gives up at its own budget, without gRPC retries."""
+    return {"timeout": dependency_budget(name), "retry": None}
+
+class TimedSearch(GoogleSearch):
+    """SerpAPI client whose HTTP requests give up after the web_search budget."""
+
+    def __init__(self, params_dict):
+        super().__init__(params_dict)
+        self.timeout = dependency_budget("web_search")
+
+def build_search():
+    search = SerpAPIWrapper(params={"engine": "bing", "gl": "us", "hl": "en"})
+    # The wrapper builds its client class itself and has no timeout option
+    search.search_engine = TimedSearch
+    return search
 
 class LLMResponder:
-    def __init__(self, vector_store):
-        self.guard = Guard.from_rail("asha_guard.rail")
+    def __init__(self, vector_store, guard=None, gemini_model=None, search=None, safety_filter=None,
+                 job_index=None, gateway=None):
+        # Components can be built elsewhere (e.g. in parallel during warm-up) and passed in
+        self.guard = guard if guard is not None else build_guard()
         self.vector_store = vector_store
-        self.gemini_model = ChatGoogleGenerativeAI(model="gemini-1.5-flash", temperature=0)
-        self.search = SerpAPIWrapper(params={"engine": "bing", "gl": "us", "hl": "en"})
-        self.safety_filter = WomenFocusedChatbotSafety()
+        self.gemini_model = gemini_model if gemini_model is not None else build_gemini_model()
+        self.search = search if search is not None else build_search()
+        self.safety_filter = safety_filter if safety_filter is not None else WomenFocusedChatbotSafety()
+        self.gateway = gateway if gateway is not None else LLMGateway()
+        self.job_index = job_index if job_index is not None else JobIndex()
+        self.job_index_ttl = float(os.getenv("JOB_INDEX_TTL_SECONDS", "3600"))
+        self.request_deadline = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+        self.breakers = {name: CircuitBreaker(name) for name in DEFAULT_BUDGETS}
+        self._local = threading.local()
+        # (path, scraped_at, events) of the newest events snapshot
+        self._events_snapshot = None
         
         keyword_prompt = PromptTemplate(
             input_variables=["user_query"],
@@ -23,7 +78,25 @@ class LLMResponder:
         User Input: {user_query}
         Keyword:"""
         )
-        self.keyword_extractor_chain = LLMChain(llm=self.gemini_model, prompt=keyword_prompt)
+        self.keyword_extractor_chain = LLMChain(
+            llm=self.gemini_model, prompt=keyword_prompt,
+            llm_kwargs=gemini_request_options("keyword_extractor"),
+        )
+
+        job_detection_prompt = PromptTemplate(
+            input_variables=["user_query"],
+            template="""Determine if the user's query is primarily about finding job openings, applying for jobs, or exploring employment opportunities. 
+If the query is about salary, salary comparison, platform comparison, or confidential topics, respond "no".
+        Respond ONLY with "yes" or "no" (no extra text).
+
+        User Input: {user_query}
+        Answer:"""
+        )
+
+        self.job_detector_chain = LLMChain(
+            llm=self.gemini_model, prompt=job_detection_prompt,
+            llm_kwargs=gemini_request_options("job_detector"),
+        )
 
         DEFAULT_TEMPLATE = """The following is a friendly conversation between a human and a Career Advisor. The Advisor guides the user regarding jobs, interests, upcoming job events, workshops, bootcamp and domain selection decisions.
         It follows the previous conversation to do so.
@@ -52,26 +125,135 @@ class LLMResponder:
             input_variables=["context", "input", "text", "web_knowledge","events_data","jobs_info"],
             template=DEFAULT_TEMPLATE
         )
-        self.chain = LLMChain(llm=self.gemini_model, prompt=self.template)
+        self.chain = LLMChain(llm=self.gemini_model, prompt=self.template, llm_kwargs=gemini_request_options("llm"))
+
+        # Two-tier caches shared by every worker (see cache_store). LLM results are
+        # versioned by model and prompt text, so editing a prompt starts a fresh cache
+        model_name = getattr(self.gemini_model, "model", type(self.gemini_model).__name__)
+        self.search_cache = get_cache("search", ttl=24 * 3600)
+        self.classification_cache = get_cache(
+            "classification", ttl=24 * 3600,
+            depends_on=(model_name, keyword_prompt.template, job_detection_prompt.template),
+        )
+        self.response_cache = get_cache(
+            "responses", ttl=600, depends_on=(model_name, self.template.template),
+        )
 
     def load_fallback_message(self):
         with open("asha_fallback_response.md", "r", encoding="utf-8") as f:
             return f.read()
 
-    def generate_response(self, message, history):
-        docs = self.vector_store.similarity_search(message)
+    def _recent_events(self):
+        """Events from the newest snapshot, if it is fresher than the job index TTL."""
+        if not snapshot_dir():
+            return []
+        paths = list_snapshots("events", snapshot_dir())
+        if not paths:
+            return []
+        # Decoded events are reused until a newer snapshot file appears
+        cached = self._events_snapshot
+        if cached is None or cached[0] != paths[-1]:
+            table = load_snapshot(paths[-1])
+            scraped_at = snapshot_time(table)
+            # Only the scraped_at column is read for a snapshot that is already stale
+            fresh = scraped_at is not None and time.time() - scraped_at <= self.job_index_ttl
+            cached = (paths[-1], scraped_at, to_records(table) if fresh else [])
+            self._events_snapshot = cached
+        _, scraped_at, events = cached
+        if events and time.time() - scraped_at <= self.job_index_ttl:
+            return events
+        return []
+
+    def _call(self, name, fn, deadline, shared=None, key=None, cache=None):
+        call = lambda: call_with_budget(name, fn, deadline, self.breakers[name])
+        return self._run(name, key, call, deadline, shared, cache)
+
+    def _llm_call(self, name, fn, deadline, priority, shared=None, key=None, cache=None):
+        # Admission happens before the budgeted call so queueing can't trip the breaker.
+        # The slot is held until Gemini actually answers, even if the budget runs out first.
+        def call():
+            release = self.gateway.acquire(priority, timeout=deadline.remaining())
+            return call_with_budget(name, fn, deadline, self.breakers[name], on_done=release)
+        return self._run(name, key, call, deadline, shared, cache)
+
+    def _run(self, name, key, call, deadline, shared, cache):
+        compute = call
+        # Results cached across workers are looked up before calling out; waiting
+        # for another worker computing the same key is bounded by this request's deadline
+        if cache is not None:
+            compute = lambda: cache.get_or_compute((name, key), call, max_wait=deadline.remaining())
+        try:
+            # In batch mode identical calls across items run once and share the result
+            if shared is not None:
+                return shared.get_or_compute((name, key), compute)
+            return compute()
+        except DependencyUnavailable:
+            # Responses built around a failed dependency are not cached
+            self._local.degraded = True
+            raise
+
+    def breaker_status(self):
+        return {name: breaker.status() for name, breaker in self.breakers.items()}
+
+    def generate_response(self, message, history, shared=None, priority=None):
+        """
+        shared: optional SharedWork used by batch evaluation to deduplicate
+        search, retrieval and classification across items. Batch runs skip the
+        response cache so prompt changes are always evaluated.
+        priority: overrides the gateway priority of every LLM call (e.g. batch).
+        """
+        response_key = (normalize_text(message), history)
+        if shared is None:
+            cached = self.response_cache.get(response_key)
+            if cached is not None:
+                return cached
+
+        self._local.degraded = False
+        response = self._generate_response(message, history, shared, priority)
+        if shared is None and not self._local.degraded:
+            self.response_cache.set(response_key, response)
+        return response
+
+    def _generate_response(self, message, history, shared, priority):
+        # Every external call gets min(its own budget, time left on this deadline)
+        deadline = Deadline(self.request_deadline)
+        message_key = normalize_text(message)
+        final_priority = PRIORITY_INTERACTIVE if priority is None else priority
+        classification_priority = PRIORITY_CLASSIFICATION if priority is None else priority
+
+        try:
+            docs = self._call(
+                "vector_store", lambda: self.vector_store.similarity_search(message), deadline,
+                shared, message_key,
+            )
+        except DependencyUnavailable as e:
+            print(f"⚠️ Vector search failed: {str(e)}")
+            docs = []
 
         # 🔥 Safe web search
         try:
-            web_knowledge = self.search.run(message)
+            web_knowledge = self._call(
+                "web_search", lambda: self.search.run(message), deadline, shared, message_key,
+                self.search_cache,
+            )
         except Exception as e:
             print(f"⚠️ Web search failed via SerpAPI: {str(e)}")
             web_knowledge = "No relevant web knowledge found."
 
         # 🔥 Extract job/event keyword
         try:
-            clean_keyword = self.keyword_extractor_chain.predict(user_query=message).strip().lower()
+            clean_keyword = self._llm_call(
+                "keyword_extractor",
+                lambda: self.keyword_extractor_chain.predict(user_query=message),
+                deadline,
+                classification_priority,
+                shared,
+                message_key,
+                self.classification_cache,
+            ).strip().lower()
             print(f"🎯 Cleaned keyword extracted from LLM: {clean_keyword}")
+        except GatewayOverloaded:
+            raise
         except Exception as e:
             print(f"⚠️ Failed to extract keyword: {str(e)}")
             clean_keyword = ""
@@ -79,18 +261,19 @@ class LLMResponder:
         jobs_info = ""
         events_data = ""
 
-        job_detection_prompt = PromptTemplate(
-        input_variables=["user_query"],
-        template="""Determine if the user's query is primarily about finding job openings, applying for jobs, or exploring employment opportunities. 
-If the query is about salary, salary comparison, platform comparison, or confidential topics, respond "no".
-        Respond ONLY with "yes" or "no" (no extra text).
-
-        User Input: {user_query}
-        Answer:"""
-        )
-
-        self.job_detector_chain = LLMChain(llm=self.gemini_model, prompt=job_detection_prompt)
-        is_job_related = self.job_detector_chain.predict(user_query=message).strip().lower()
+        try:
+            is_job_related = self._llm_call(
+                "job_detector",
+                lambda: self.job_detector_chain.predict(user_query=message),
+                deadline,
+                classification_priority,
+                shared,
+                message_key,
+                self.classification_cache,
+            ).strip().lower()
+        except DependencyUnavailable as e:
+            print(f"⚠️ Failed to detect job intent: {str(e)}")
+            is_job_related = "no"
         print(f"🎯 is_job_related extracted from LLM: {is_job_related}")
 
         if is_job_related == "yes":
@@ -98,8 +281,21 @@ If the query is about salary, salary comparison, platform comparison, or confide
         # 🔥 Fetch jobs
         #if "job" in message.lower() or "apply" in message.lower():
             try:
-                print("🔄 Trying to fetch jobs info...")
-                jobs = get_jobs_by_keyword(clean_keyword)
+                # Serve recently scraped listings from the local index before scraping again.
+                # Whole-token matches only: "java" must not be answered by JavaScript listings
+                jobs = self.job_index.search(clean_keyword, max_age=self.job_index_ttl, prefix=False)["jobs"]
+                if not jobs:
+                    print("🔄 Trying to fetch jobs info...")
+                    jobs = self._call(
+                        "jobs",
+                        lambda: get_jobs_by_keyword(
+                            clean_keyword, timeout=min(dependency_budget("jobs"), deadline.remaining())
+                        ),
+                        deadline,
+                        shared,
+                        clean_keyword,
+                    )
+                    self.job_index.add_jobs(jobs)
                 if jobs:
                     jobs_info = "\n\n".join([
                         f"🔹 **{job['title']}** at {job['company']} ({job['location']})"
@@ -115,8 +311,17 @@ If the query is about salary, salary comparison, platform comparison, or confide
         event_keywords = ["event", "bootcamp", "workshop", "career fair", "networking"]
         if any(kw in message.lower() for kw in event_keywords):
             try:
-                print("🔄 Trying to fetch featured events...")
-                events = fetch_herkey_featured_events_safari()
+                events = self._recent_events()
+                if not events:
+                    print("🔄 Trying to fetch featured events...")
+                    events = self._call(
+                        "events",
+                        lambda: get_all_events(
+                            timeout=min(dependency_budget("events"), deadline.remaining())
+                        ),
+                        deadline,
+                        shared,
+                    )
                 if events:
                     events_data = "\n\n".join([
                         f"🔹 [{ev['name']}]({ev['link']})" for ev in events[:5]
@@ -129,14 +334,16 @@ If the query is about salary, salary comparison, platform comparison, or confide
 
         # 🔥 Final LLM output
         try:
-            raw_response = self.chain.predict(
+            raw_response = self._llm_call("llm", lambda: self.chain.predict(
                 context=history,
                 input=message,
                 text=docs,
                 web_knowledge=web_knowledge,
                 jobs_info=jobs_info,
                 events_data=events_data
-            )
+            ), deadline, final_priority)
+        except GatewayOverloaded:
+            raise
         except Exception as e:
             print(f"⚠️ LLM chain failed to generate response: {str(e)}")
             raw_response = ""
@@ -148,6 +355,7 @@ If the query is about salary, salary comparison, platform comparison, or confide
             extracted_response = raw_response.strip()
         else:
             print("⚠️ Empty raw response received from LLM.")
+            self._local.degraded = True
             extracted_response = "I'm here to assist you! Could you please rephrase or ask your query again?"
 
         print(f"📝 Extracted response: {extracted_response}")
@@ -175,7 +383,9 @@ If the query is about salary, salary comparison, platform comparison, or confide
 
         # 🔥 Guardrails Validation
         try:
-            validation_output = self.guard.validate(llm_output=conversation_reply)
+            validation_output = self._call(
+                "guard", lambda: self.guard.validate(llm_output=conversation_reply), deadline
+            )
             print(validation_output)
             print("✅ Guardrails validation success.")
 
@@ -0,0 +1,156 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Lower runs first: the final answer the user waits on beats classification calls
+PRIORITY_INTERACTIVE = 0
+PRIORITY_CLASSIFICATION = 1
+# Offline/bulk work only runs when nothing interactive is waiting
+PRIORITY_BATCH = 2
+
+
+class GatewayOverloaded(Exception):
+    """Raised when a call can't be admitted; the API turns this into a 503."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMGateway:
+    """
+    Admission control shared by every Gemini call: a token bucket caps the
+    request rate, a concurrency limit caps calls in flight, and waiting calls
+    are admitted in priority order. When the queue is full a new call either
+    evicts a lower-priority waiter or is rejected immediately.
+    """
+
+    def __init__(self, rate_per_second=None, burst=None, max_concurrency=None,
+                 max_queue=None, max_wait=None):
+        self.rate = rate_per_second or float(os.getenv("LLM_RATE_PER_SECOND", "5"))
+        self.burst = burst or float(os.getenv("LLM_BURST", "10"))
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        self.max_queue = max_queue or int(os.getenv("LLM_MAX_QUEUE", "100"))
+        self.max_wait = max_wait or float(os.getenv("LLM_MAX_WAIT_SECONDS", "10"))
+
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        self._waiting = []
+        self._seq = itertools.count()
+        self._evicted = set()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.evicted = 0
+        self._wait_times = deque(maxlen=1000)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _retry_after(self):
+        # Rough time for the current queue to drain at the configured rate
+        return max(1, int(len(self._waiting) / self.rate) + 1)
+
+    def _can_run(self, ticket):
+        return (
+            self._waiting[0] == ticket
+            and self._in_flight < self.max_concurrency
+            and self._tokens >= 1
+        )
+
+    @contextmanager
+    def admit(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Blocks until the call may run, then holds a concurrency slot for the
+        duration of the with-block. Raises GatewayOverloaded if the queue is
+        full of calls at least as urgent, the call is evicted by a more urgent
+        one, or it can't be admitted within timeout / max_wait.
+        """
+        release = self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            release()
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Like admit, but returns a function that frees the slot. Use it when the
+        call can outlive the caller, e.g. one abandoned after its time budget;
+        the slot is only freed once the call has really finished.
+        """
+        wait_limit = self.max_wait if timeout is None else min(timeout, self.max_wait)
+        start = time.monotonic()
+
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                # The newest of the lowest-priority waiters makes room for a more urgent call
+                worst = max(self._waiting)
+                if priority >= worst[0]:
+                    self.rejected += 1
+                    raise GatewayOverloaded("LLM queue is full", self._retry_after())
+                self._waiting.remove(worst)
+                heapq.heapify(self._waiting)
+                self._evicted.add(worst)
+                self.evicted += 1
+                self._cond.notify_all()
+
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if ticket in self._evicted:
+                        self._evicted.discard(ticket)
+                        self.rejected += 1
+                        raise GatewayOverloaded("Evicted by a higher-priority LLM call", self._retry_after())
+                    self._refill()
+                    if self._can_run(ticket):
+                        break
+                    remaining = wait_limit - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise GatewayOverloaded("Timed out waiting for an LLM slot", self._retry_after())
+                    # Wake up at least when the next token is due
+                    token_wait = (1 - self._tokens) / self.rate if self._tokens < 1 else remaining
+                    self._cond.wait(min(remaining, max(token_wait, 0.01)))
+            finally:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+            self._tokens -= 1
+            self._in_flight += 1
+            self.admitted += 1
+            self._wait_times.append(time.monotonic() - start)
+
+        released = []
+
+        def release():
+            with self._cond:
+                if released:
+                    return
+                released.append(True)
+                self._in_flight -= 1
+                self._cond.notify_all()
+        return release
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._wait_times)
+            return {
+                "queue_depth": len(self._waiting),
+                "in_flight": self._in_flight,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "evicted": self.evicted,
+                "wait_avg_ms": round(1000 * sum(waits) / len(waits), 1) if waits else 0.0,
+                "wait_p95_ms": round(1000 * waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            }
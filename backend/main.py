@@ -1,15 +1,73 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
+import json
 import os
 
-from pdf_loader import load_pdf_embeddings
-from llm_engine import LLMResponder
+from pdf_loader import load_pdf_embeddings, build_embeddings
+from llm_engine import LLMResponder, build_guard, build_gemini_model, build_search
+from chatbot_safety_module import WomenFocusedChatbotSafety
+from warmup import WarmupManager, ComponentNotReady
+from shared_index import process_memory
+from job_index import JobIndex
+from llm_gateway import LLMGateway, GatewayOverloaded
+from batch_eval import run_batch
+from cache_store import cache_stats
+from snapshots import latest_records, snapshot_dir
 
 load_dotenv()
-vector_store = load_pdf_embeddings()
-responder = LLMResponder(vector_store)
+
+# Scraped jobs are kept here so /jobs/search never needs a browser; listings
+# older than JOB_INDEX_TTL_SECONDS are dropped rather than served as current
+job_index = JobIndex(ttl=float(os.getenv("JOB_INDEX_TTL_SECONDS", "3600")))
+
+# One admission gateway for every Gemini call made by this worker
+llm_gateway = LLMGateway()
+
+# Heavy components load in the background so the port is bound immediately
+warmup = WarmupManager()
+warmup.register("embeddings", build_embeddings)
+warmup.register("vector_store", lambda: load_pdf_embeddings(embeddings=warmup.get("embeddings")))
+warmup.register("guard", build_guard)
+warmup.register("gemini_model", build_gemini_model)
+warmup.register("search", build_search)
+warmup.register("safety_filter", lambda: WomenFocusedChatbotSafety(
+    gender_direction_path=os.getenv("GENDER_DIRECTION_PATH") or None,
+    onnx_model_dir=os.getenv("BIAS_ONNX_MODEL_DIR") or None,
+))
+
+def restore_job_snapshots():
+    """
+    Fill the job index from saved snapshots so restarts don't need a scrape.
+    Optional: a failure is logged and the index starts empty, so it never
+    keeps /ready at 503.
+    """
+    if snapshot_dir():
+        try:
+            job_index.add_jobs(latest_records("jobs", snapshot_dir()))
+        except Exception as e:
+            print(f"⚠️ Failed to restore job snapshots: {str(e)}")
+    return len(job_index)
+
+warmup.register("job_snapshots", restore_job_snapshots)
+warmup.register("responder", lambda: LLMResponder(
+    warmup.get("vector_store"),
+    guard=warmup.get("guard"),
+    gemini_model=warmup.get("gemini_model"),
+    search=warmup.get("search"),
+    safety_filter=warmup.get("safety_filter"),
+    job_index=job_index,
+    gateway=llm_gateway,
+))
+
+# Upper bounds for /ask/batch requests
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# Seconds /ask waits for warm-up before giving up with a 503
+READY_WAIT_SECONDS = float(os.getenv("READY_WAIT_SECONDS", "0"))
 
 app = FastAPI()
 
@@ -22,18 +80,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(GatewayOverloaded)
+def gateway_overloaded_handler(request: Request, exc: GatewayOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.on_event("startup")
+def start_warmup():
+    warmup.start()
+
+def get_component(name):
+    try:
+        return warmup.get(name, timeout=READY_WAIT_SECONDS)
+    except ComponentNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
 class ChatInput(BaseModel):
     message: str
     history: list[str] = []
 
+class BatchItem(BaseModel):
+    id: str | int | None = None
+    message: str
+    history: list[str] = []
+
+class BatchInput(BaseModel):
+    items: list[BatchItem] = Field(..., max_length=BATCH_MAX_ITEMS)
+    concurrency: int = Field(4, ge=1)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
+@app.get("/ready")
+def readiness_check():
+    ready = warmup.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "components": warmup.status()},
+    )
+
+@app.get("/metrics")
+def get_metrics():
+    # Served during warm-up too; sections for components not yet loaded are left out
+    metrics = {
+        "memory": process_memory(),
+        "llm_gateway": llm_gateway.stats(),
+        "caches": cache_stats(),
+    }
+    if warmup.is_ready("embeddings"):
+        metrics["embedding_cache"] = warmup.get("embeddings", timeout=0).stats()
+    if warmup.is_ready("responder"):
+        metrics["circuit_breakers"] = warmup.get("responder", timeout=0).breaker_status()
+    return metrics
+
 @app.post("/ask")
 def ask_question(data: ChatInput):
     print("🚨 *******************:")
     print("🚨 Received data:", data)
+    responder = get_component("responder")
     history_text = ""
     for i, msg in enumerate(data.history):
         role = "Human" if i % 2 == 0 else "Career Expert"
@@ -43,6 +151,39 @@ def ask_question(data: ChatInput):
     answer = responder.generate_response(data.message, history_text)
     return {"response": answer}
 
+@app.get("/jobs/search")
+def search_jobs(
+    q: str = "",
+    location: str | None = None,
+    work_type: str | None = None,
+    min_experience: int | None = None,
+    max_experience: int | None = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+):
+    return job_index.search(
+        q,
+        location=location,
+        work_type=work_type,
+        min_experience=min_experience,
+        max_experience=max_experience,
+        page=page,
+        page_size=page_size,
+    )
+
+@app.post("/ask/batch")
+def ask_batch(data: BatchInput):
+    """Answers many questions, streaming one JSON line per item as it finishes."""
+    responder = get_component("responder")
+    items = [item.model_dump(exclude_none=True) for item in data.items]
+    concurrency = min(data.concurrency, BATCH_MAX_CONCURRENCY)
+
+    def stream():
+        for result in run_batch(responder, items, concurrency=concurrency):
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @app.get("/suggestions")
 def get_suggestions():
     return {
@@ -51,4 +192,4 @@ def get_suggestions():
             "How to switch from commerce to tech?",
             "Will AI replace software engineers?"
         ]
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,213 @@
+"""
+Embedding-based gender bias scoring on CPU with an int8-quantized ONNX export
+of the safety module's BERT model.
+
+Usage:
+    python onnx_bias_scorer.py export --model bert-base-uncased --out onnx_bias_model
+    python onnx_bias_scorer.py benchmark --model-dir onnx_bias_model
+"""
+import argparse
+import os
+import re
+import time
+
+import numpy as np
+import onnxruntime as ort
+import psutil
+from transformers import AutoTokenizer
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def export_onnx_model(model_name, output_dir):
+    """Export the model to ONNX, quantize its weights to int8, and save the tokenizer."""
+    import torch
+    from transformers import AutoModel
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+
+    sample = tokenizer(["a sample sentence"], return_tensors="pt")
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=14,
+        )
+
+    quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    return output_dir
+
+
+def split_sentences(text):
+    return [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if s.strip()]
+
+
+class OnnxSentenceEncoder:
+    """Mean-pooled sentence embeddings from the quantized ONNX model."""
+
+    def __init__(self, model_dir, threads=None, max_length=128):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_length = max_length
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, INT8_FILE), options, providers=["CPUExecutionProvider"]
+        )
+
+    def encode(self, sentences, batch_size=32):
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = []
+        for start in range(0, len(sentences), batch_size):
+            batch = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np",
+            )
+            mask = batch["attention_mask"].astype(np.int64)
+            hidden = self.session.run(
+                ["last_hidden_state"],
+                {"input_ids": batch["input_ids"].astype(np.int64), "attention_mask": mask},
+            )[0]
+            # Mean over real tokens only, matching how the gender direction was built
+            weights = mask[..., None].astype(np.float32)
+            embeddings.append((hidden * weights).sum(axis=1) / weights.sum(axis=1))
+        return np.concatenate(embeddings)
+
+
+class EmbeddingBiasScorer:
+    """
+    Scores text by projecting each sentence embedding onto the gender direction.
+    Positive projections lean masculine, negative lean feminine; the text score
+    is the largest absolute cosine over its sentences.
+    """
+
+    def __init__(self, encoder, gender_direction):
+        self.encoder = encoder
+        direction = np.asarray(gender_direction, dtype=np.float32)
+        self.direction = direction / np.linalg.norm(direction)
+
+    def score_batch(self, texts, batch_size=32):
+        """Scores many texts with all of their sentences encoded in shared batches."""
+        sentences, owners = [], []
+        for i, text in enumerate(texts):
+            for sentence in split_sentences(text):
+                sentences.append(sentence)
+                owners.append(i)
+
+        results = [{"embedding_bias_score": 0.0, "sentence_projections": []} for _ in texts]
+        if not sentences:
+            return results
+
+        embeddings = self.encoder.encode(sentences, batch_size=batch_size)
+        norms = np.linalg.norm(embeddings, axis=1)
+        projections = (embeddings @ self.direction) / np.maximum(norms, 1e-12)
+
+        for owner, sentence, projection in zip(owners, sentences, projections):
+            results[owner]["sentence_projections"].append(
+                {"sentence": sentence, "projection": round(float(projection), 4)}
+            )
+        for result in results:
+            if result["sentence_projections"]:
+                result["embedding_bias_score"] = max(
+                    abs(p["projection"]) for p in result["sentence_projections"]
+                )
+        return results
+
+
+def _rss_mb():
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def run_benchmark(model_dir, model_name, sentences, batch_sizes=(1, 8, 32), repeats=3):
+    """Latency and memory of PyTorch fp32 vs ONNX int8 sentence encoding."""
+    import torch
+    from transformers import AutoModel
+
+    def torch_encoder():
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModel.from_pretrained(model_name)
+        model.eval()
+
+        def encode(batch):
+            inputs = tokenizer(batch, padding=True, truncation=True, max_length=128, return_tensors="pt")
+            with torch.no_grad():
+                hidden = model(**inputs).last_hidden_state
+            mask = inputs["attention_mask"].unsqueeze(-1).float()
+            return ((hidden * mask).sum(dim=1) / mask.sum(dim=1)).numpy()
+        return encode
+
+    def onnx_encoder():
+        encoder = OnnxSentenceEncoder(model_dir)
+        return lambda batch: encoder.encode(batch, batch_size=len(batch))
+
+    rows, outputs = [], {}
+    for name, factory in (("pytorch-fp32", torch_encoder), ("onnx-int8", onnx_encoder)):
+        before = _rss_mb()
+        encode = factory()
+        loaded = _rss_mb() - before
+        encode(sentences[:1])  # warm-up
+
+        for batch_size in batch_sizes:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                for i in range(0, len(sentences), batch_size):
+                    encode(sentences[i:i + batch_size])
+            per_sentence = (time.perf_counter() - start) * 1000 / (repeats * len(sentences))
+            rows.append({"backend": name, "batch": batch_size, "ms_per_sentence": per_sentence,
+                         "model_rss_mb": loaded})
+        outputs[name] = encode(sentences)
+
+    a, b = outputs["pytorch-fp32"], outputs["onnx-int8"]
+    agreement = float(np.mean(np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))))
+    return rows, agreement
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or benchmark the ONNX bias scorer.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("--model", default="bert-base-uncased")
+    export.add_argument("--out", default="onnx_bias_model")
+    bench = sub.add_parser("benchmark")
+    bench.add_argument("--model", default="bert-base-uncased")
+    bench.add_argument("--model-dir", default="onnx_bias_model")
+    bench.add_argument("--sentences", type=int, default=128)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx_model(args.model, args.out)
+        for file in (FP32_FILE, INT8_FILE):
+            size = os.path.getsize(os.path.join(args.out, file)) / 1e6
+            print(f"{file}: {size:.1f} MB")
+    else:
+        samples = [
+            "She is a great engineer and leads the backend team.",
+            "Nursing is a rewarding career for anyone who enjoys caring for people.",
+            "He should apply for the data analyst role at the startup.",
+            "Remote roles make it easier to return to work after a career break.",
+        ]
+        sentences = [samples[i % len(samples)] for i in range(args.sentences)]
+        rows, agreement = run_benchmark(args.model_dir, args.model, sentences)
+        print(f"{'backend':<14}{'batch':>6}{'ms/sentence':>14}{'model RSS (MB)':>16}")
+        for row in rows:
+            print(f"{row['backend']:<14}{row['batch']:>6}{row['ms_per_sentence']:>14.2f}{row['model_rss_mb']:>16.1f}")
+        print(f"\nMean cosine between fp32 and int8 embeddings: {agreement:.4f}")
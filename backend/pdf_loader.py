@@ -2,9 +2,23 @@ import os
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from embedding_cache import CachedEmbeddings
+from cache_store import get_cache
+from vector_index import build_vector_store
+from chunk_dedup import MinHashDeduplicator
+from shared_index import build_lock, load_shared_index, save_shared_index, shared_index_exists
 
-def load_pdf_embeddings(pdf_dir='pdf'):
+def build_embeddings():
+    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    return CachedEmbeddings(
+        embeddings,
+        max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+        persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        # Vectors from different embedding models must never mix
+        shared_cache=get_cache("embeddings", ttl=30 * 24 * 3600, depends_on=(embeddings.model,)),
+    )
+
+def load_pdf_chunks(pdf_dir='pdf'):
     text_chunks = []
     for file in os.listdir(pdf_dir):
         if file.endswith(".pdf"):
@@ -15,5 +29,27 @@ def load_pdf_embeddings(pdf_dir='pdf'):
             chunks = splitter.split_text(text)
             text_chunks.extend(chunks)
 
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    return FAISS.from_texts(text_chunks, embeddings)
\ No newline at end of file
+    threshold = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+    if threshold < 1.0:
+        deduplicator = MinHashDeduplicator(threshold=threshold)
+        text_chunks, stats = deduplicator.deduplicate(text_chunks)
+        print(f"🧹 Removed {stats['removed_chunks']}/{stats['input_chunks']} near-duplicate chunks "
+              f"({stats['removed_ratio']:.1%}, {stats['removed_chars']} chars)")
+    return text_chunks
+
+def load_pdf_embeddings(pdf_dir='pdf', embeddings=None, index_type=None):
+    if embeddings is None:
+        embeddings = build_embeddings()
+
+    # With several workers, build the index once on disk and let every worker mmap it
+    shared_dir = os.getenv("SHARED_INDEX_DIR")
+    if shared_dir:
+        with build_lock(shared_dir):
+            if not shared_index_exists(shared_dir):
+                text_chunks = load_pdf_chunks(pdf_dir)
+                vector_store = build_vector_store(text_chunks, embeddings, index_type=index_type)
+                save_shared_index(vector_store, text_chunks, shared_dir)
+        return load_shared_index(shared_dir, embeddings)
+
+    text_chunks = load_pdf_chunks(pdf_dir)
+    return build_vector_store(text_chunks, embeddings, index_type=index_type)
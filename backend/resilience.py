@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+# Calls run here so a slow dependency can be abandoned when its budget runs out.
+# Abandoned calls finish in the background; the pool is sized so they don't starve new requests.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DEPENDENCY_THREADS", "64")), thread_name_prefix="dependency"
+)
+
+# Default per-dependency budgets in seconds, overridable with BUDGET_<NAME> env vars
+DEFAULT_BUDGETS = {
+    "vector_store": 2.0,
+    "web_search": 5.0,
+    "keyword_extractor": 5.0,
+    "job_detector": 5.0,
+    "jobs": 15.0,
+    "events": 15.0,
+    "llm": 15.0,
+    "guard": 5.0,
+}
+
+
+def dependency_budget(name):
+    return float(os.getenv(f"BUDGET_{name.upper()}", DEFAULT_BUDGETS[name]))
+
+
+class DependencyUnavailable(Exception):
+    """Raised when a dependency timed out, failed, or its circuit is open."""
+
+
+class Deadline:
+    """End-to-end time budget for one request."""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated errors from one dependency.
+    closed: calls go through. open: calls fail immediately until reset_timeout
+    has passed. half_open: one trial call decides whether to close or reopen.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                return True
+            # Only one trial call while half open
+            return self.state == self.CLOSED
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️ Circuit for {self.name} opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_inconclusive(self):
+        """The call was cut short by the caller, which says nothing about the dependency."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # Let the next call make the trial; reset_timeout has already passed
+                self.state = self.OPEN
+
+    def status(self):
+        with self._lock:
+            return {"state": self.state, "failures": self.failures}
+
+
+def call_with_budget(name, fn, deadline, breaker, on_done=None):
+    """
+    Runs fn() with a timeout of min(dependency budget, time left on deadline),
+    through the dependency's circuit breaker.
+    Raises DependencyUnavailable instead of waiting past the budget.
+    on_done, if given, is called once fn has actually finished (even after the
+    budget ran out), or right away if fn never started.
+    """
+    budget = dependency_budget(name)
+    timeout = min(budget, deadline.remaining())
+    try:
+        if timeout <= 0:
+            raise DependencyUnavailable(f"{name}: request deadline exceeded")
+        if not breaker.allow_request():
+            raise DependencyUnavailable(f"{name}: circuit open")
+        future = _executor.submit(fn)
+    except BaseException:
+        if on_done is not None:
+            on_done()
+        raise
+    if on_done is not None:
+        future.add_done_callback(lambda _: on_done())
+    try:
+        result = future.result(timeout=timeout)
+    except FutureTimeout:
+        # Only the dependency's own budget running out counts against it; a
+        # request whose deadline was mostly spent elsewhere doesn't trip the breaker
+        if timeout < budget:
+            breaker.record_inconclusive()
+            raise DependencyUnavailable(f"{name}: request deadline exceeded after {timeout:.1f}s")
+        breaker.record_failure()
+        raise DependencyUnavailable(f"{name}: timed out after {timeout:.1f}s")
+    except Exception as e:
+        breaker.record_failure()
+        raise DependencyUnavailable(f"{name}: {str(e)}")
+    breaker.record_success()
+    return result
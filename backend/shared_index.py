@@ -0,0 +1,188 @@
+import fcntl
+import os
+from collections.abc import Mapping
+from contextlib import contextmanager
+
+import faiss
+import numpy as np
+import psutil
+from langchain_core.documents import Document
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+
+INDEX_FILE = "index.faiss"
+TEXTS_FILE = "texts.bin"
+OFFSETS_FILE = "offsets.npy"
+# Flat indexes only: raw vectors and their squared norms, searched by MmapFlatIndex
+VECTORS_FILE = "vectors.npy"
+NORMS_FILE = "norms.npy"
+LOCK_FILE = ".build.lock"
+
+
+class _IdentityIds(Mapping):
+    """Maps FAISS row i to docstore id "i" without a per-worker dict."""
+
+    def __init__(self, size):
+        self._size = size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self._size:
+            raise KeyError(i)
+        return str(i)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+
+class MmapDocstore(Docstore):
+    """
+    Read-only docstore over one memory-mapped UTF-8 blob plus an offsets array.
+    The pages are shared by every worker through the OS page cache and are
+    never written to, so they stay shared after fork.
+    """
+
+    def __init__(self, directory):
+        self._texts = np.memmap(os.path.join(directory, TEXTS_FILE), dtype=np.uint8, mode="r")
+        self._offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode="r")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def search(self, search):
+        i = int(search)
+        if not 0 <= i < len(self):
+            return f"ID {search} not found."
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return Document(page_content=self._texts[start:end].tobytes().decode("utf-8"))
+
+    def add(self, texts):
+        raise NotImplementedError("MmapDocstore is read-only")
+
+
+class MmapFlatIndex:
+    """
+    Exact L2 search over memory-mapped vectors, standing in for IndexFlatL2.
+    FAISS 1.8 can only mmap IVF inverted lists and reads flat codes into each
+    process's private memory; here every worker searches the same page-cache
+    pages. Implements the part of the FAISS index API the LangChain store uses.
+    """
+
+    metric_type = faiss.METRIC_L2
+
+    def __init__(self, directory):
+        self._vectors = np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+        self._norms = np.load(os.path.join(directory, NORMS_FILE), mmap_mode="r")
+        self.ntotal, self.d = self._vectors.shape
+
+    def search(self, queries, k):
+        """Squared L2 distances and ids of the k nearest vectors, padded with -1 like FAISS."""
+        queries = np.asarray(queries, dtype=np.float32)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        found = min(k, self.ntotal)
+        if found == 0:
+            return distances, ids
+
+        # |q - v|^2 = |q|^2 - 2 q.v + |v|^2, with |v|^2 precomputed at save time
+        all_distances = (queries ** 2).sum(axis=1, keepdims=True) - 2 * (queries @ self._vectors.T) + self._norms
+        nearest = np.argpartition(all_distances, found - 1, axis=1)[:, :found]
+        nearest_distances = np.take_along_axis(all_distances, nearest, axis=1)
+        order = np.argsort(nearest_distances, axis=1)
+        ids[:, :found] = np.take_along_axis(nearest, order, axis=1)
+        distances[:, :found] = np.maximum(np.take_along_axis(nearest_distances, order, axis=1), 0)
+        return distances, ids
+
+    def reconstruct(self, i):
+        return np.array(self._vectors[i])
+
+
+def save_shared_index(vector_store, texts, directory):
+    """Write the FAISS index and chunk texts in a layout load_shared_index can mmap."""
+    os.makedirs(directory, exist_ok=True)
+
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+
+    # Write to temp names then rename, so readers never see a partial index
+    def publish(name, write):
+        tmp_path = os.path.join(directory, name + ".tmp")
+        write(tmp_path)
+        os.replace(tmp_path, os.path.join(directory, name))
+
+    def write_texts(path):
+        with open(path, "wb") as f:
+            f.write(b"".join(encoded))
+
+    def write_array(array):
+        def write(path):
+            with open(path, "wb") as f:
+                np.save(f, array)
+        return write
+
+    publish(TEXTS_FILE, write_texts)
+    publish(OFFSETS_FILE, write_array(offsets))
+    index = vector_store.index
+    if isinstance(index, faiss.IndexFlatL2):
+        vectors = index.reconstruct_n(0, index.ntotal)
+        publish(VECTORS_FILE, write_array(vectors))
+        publish(NORMS_FILE, write_array((vectors ** 2).sum(axis=1)))
+    else:
+        for name in (VECTORS_FILE, NORMS_FILE):
+            if os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+    # Written last: its presence marks the shared index as complete
+    publish(INDEX_FILE, lambda path: faiss.write_index(index, path))
+
+
+def shared_index_exists(directory):
+    return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+
+def load_shared_index(directory, embeddings):
+    """
+    Load a saved index read-only. Chunk texts are memory-mapped, and so are the
+    vectors of a flat index (see MmapFlatIndex). For IVF-PQ, FAISS maps the
+    inverted lists; an HNSW index (graph and vectors) is read into each
+    worker's own memory, so it grows with the number of workers.
+    """
+    if os.path.exists(os.path.join(directory, VECTORS_FILE)):
+        index = MmapFlatIndex(directory)
+    else:
+        index = faiss.read_index(
+            os.path.join(directory, INDEX_FILE),
+            faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY,
+        )
+    docstore = MmapDocstore(directory)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=_IdentityIds(len(docstore)),
+    )
+
+
+@contextmanager
+def build_lock(directory):
+    """Exclusive file lock so only one worker builds the shared index."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def process_memory():
+    """RSS, PSS and USS (in MB) of the current process; PSS/USS need Linux."""
+    info = psutil.Process().memory_full_info()
+    return {
+        "pid": os.getpid(),
+        "rss_mb": round(info.rss / 1e6, 1),
+        "pss_mb": round(getattr(info, "pss", 0) / 1e6, 1),
+        "uss_mb": round(getattr(info, "uss", 0) / 1e6, 1),
+    }
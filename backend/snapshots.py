@@ -0,0 +1,169 @@
+import glob
+import os
+from datetime import datetime, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Arrow IPC files rather than Parquet: they can be memory-mapped and read
+# without copying or decoding, which is what makes loading on startup cheap.
+SCHEMAS = {
+    "jobs": pa.schema([
+        ("title", pa.string()),
+        ("company", pa.string()),
+        ("location", pa.string()),
+        ("work_type", pa.string()),
+        ("experience", pa.string()),
+        ("source_url", pa.string()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+    ]),
+    "events": pa.schema([
+        ("name", pa.string()),
+        ("link", pa.string()),
+        ("source_url", pa.string()),
+        ("scraped_at", pa.timestamp("us", tz="UTC")),
+    ]),
+}
+
+# Columns that identify the same listing across snapshots
+KEY_COLUMNS = {
+    "jobs": ["title", "company", "location"],
+    "events": ["link"],
+}
+
+
+def snapshot_dir():
+    return os.getenv("SNAPSHOT_DIR")
+
+
+def save_snapshot(kind, records, directory, source_url=None, keep=None):
+    """
+    Writes records (job or event dicts) as a timestamped Arrow file and
+    prunes all but the newest `keep` snapshots of that kind.
+    Returns the path written.
+    """
+    schema = SCHEMAS[kind]
+    now = datetime.now(timezone.utc)
+    columns = {
+        name: [r.get(name) for r in records]
+        for name in schema.names if name not in ("source_url", "scraped_at")
+    }
+    columns["source_url"] = [r.get("source_url", source_url) for r in records]
+    columns["scraped_at"] = [now] * len(records)
+    table = pa.Table.from_pydict(columns, schema=schema)
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}-{now.strftime('%Y%m%dT%H%M%S%f')}.arrow")
+    tmp_path = path + ".tmp"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with pa.ipc.new_file(sink, schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+    if keep is None:
+        keep = int(os.getenv("SNAPSHOT_KEEP", "50"))
+    for old_path in list_snapshots(kind, directory)[:-keep]:
+        os.remove(old_path)
+    return path
+
+
+def save_snapshot_if_enabled(kind, records, source_url=None):
+    """Called by the fetchers; a no-op unless SNAPSHOT_DIR is set."""
+    directory = snapshot_dir()
+    if not directory or not records:
+        return None
+    try:
+        return save_snapshot(kind, records, directory, source_url=source_url)
+    except Exception as e:
+        print(f"⚠️ Failed to save {kind} snapshot: {str(e)}")
+        return None
+
+
+def list_snapshots(kind, directory):
+    """Snapshot paths of one kind, oldest first (names sort by timestamp)."""
+    return sorted(glob.glob(os.path.join(directory, f"{kind}-*.arrow")))
+
+
+def load_snapshot(path):
+    """Memory-maps a snapshot; column buffers point straight into the file."""
+    source = pa.memory_map(path, "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_latest(kind, directory):
+    """The newest snapshot of a kind as an Arrow table, or None."""
+    paths = list_snapshots(kind, directory)
+    return load_snapshot(paths[-1]) if paths else None
+
+
+def snapshot_time(table):
+    """Scrape time of a snapshot in epoch seconds, read from that column alone."""
+    if table.num_rows == 0:
+        return None
+    return pc.max(table["scraped_at"]).as_py().timestamp()
+
+
+def latest_records(kind, directory):
+    """
+    The newest copy of every listing across all snapshots of a kind.
+    Snapshots are read newest first and only rows whose key wasn't in a newer
+    one are converted to dicts, so each listing is decoded once.
+    Unreadable snapshot files are skipped with a warning.
+    """
+    records, seen = [], []
+    for path in reversed(list_snapshots(kind, directory)):
+        try:
+            table = load_snapshot(path)
+            keys = _keys(kind, table).combine_chunks()
+        except Exception as e:
+            print(f"⚠️ Skipping unreadable snapshot {path}: {str(e)}")
+            continue
+        if seen:
+            unseen = pc.invert(pc.is_in(keys, value_set=pa.concat_arrays(seen)))
+            table, keys = table.filter(unseen), keys.filter(unseen)
+        records.extend(to_records(table))
+        seen.append(keys)
+    return records
+
+
+def to_records(table):
+    """Arrow table -> list of dicts with scraped_at as epoch seconds."""
+    records = table.to_pylist()
+    for record in records:
+        if record.get("scraped_at") is not None:
+            record["scraped_at"] = record["scraped_at"].timestamp()
+    return records
+
+
+def _keys(kind, table):
+    columns = [pc.fill_null(table[name], "") for name in KEY_COLUMNS[kind]]
+    return pc.binary_join_element_wise(*columns, "\x1f")
+
+
+def diff_snapshots(kind, old, new):
+    """
+    Listings added and removed between two snapshot tables, matched on
+    KEY_COLUMNS with vectorized set membership.
+    """
+    old_keys, new_keys = _keys(kind, old), _keys(kind, new)
+    added = new.filter(pc.invert(pc.is_in(new_keys, value_set=old_keys)))
+    removed = old.filter(pc.invert(pc.is_in(old_keys, value_set=new_keys)))
+    return {"added": added, "removed": removed}
+
+
+if __name__ == "__main__":
+    import sys
+
+    kind = sys.argv[1] if len(sys.argv) > 1 else "jobs"
+    directory = snapshot_dir() or "snapshots"
+    paths = list_snapshots(kind, directory)
+    if len(paths) < 2:
+        print(f"Need at least two {kind} snapshots in {directory} to diff.")
+        sys.exit(1)
+
+    changes = diff_snapshots(kind, load_snapshot(paths[-2]), load_snapshot(paths[-1]))
+    print(f"\n{os.path.basename(paths[-2])} -> {os.path.basename(paths[-1])}\n")
+    for change, table in changes.items():
+        print(f"{change}: {table.num_rows}")
+        for record in table.select(KEY_COLUMNS[kind]).to_pylist():
+            print("   " + " | ".join(str(v) for v in record.values()))
@@ -0,0 +1,97 @@
+import os
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+
+# Corpus sizes (in chunks) at which "auto" switches to a more scalable index
+HNSW_THRESHOLD = 10_000
+IVFPQ_THRESHOLD = 200_000
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+
+def choose_index_type(num_vectors):
+    """Pick an index type for a corpus of the given size."""
+    if num_vectors < HNSW_THRESHOLD:
+        return "flat"
+    if num_vectors < IVFPQ_THRESHOLD:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _pq_subquantizers(dim, preferred=64):
+    """Largest number of PQ sub-quantizers <= preferred that divides dim."""
+    for m in range(min(preferred, dim), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def build_faiss_index(vectors, index_type="auto", hnsw_m=32, ef_construction=200,
+                      ef_search=64, nlist=None, pq_m=64, pq_bits=8, nprobe=16):
+    """
+    Builds (and trains, if needed) a FAISS index over the given vectors.
+    index_type is one of "flat", "hnsw", "ivfpq" or "auto".
+    Vectors are not added; the caller adds them so ids stay in sync.
+    """
+    vectors = np.asarray(vectors, dtype="float32")
+    num_vectors, dim = vectors.shape
+
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type: {index_type}")
+
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+
+    # IVF-PQ: coarse quantizer + product-quantized residuals.
+    # FAISS wants ~39 training points per centroid, so cap nlist accordingly.
+    if nlist is None:
+        nlist = int(4 * np.sqrt(num_vectors))
+    nlist = max(1, min(nlist, num_vectors // 39))
+    pq_m = _pq_subquantizers(dim, pq_m)
+    # Each PQ codebook has 2**pq_bits centroids and also needs enough training points
+    while pq_bits > 4 and num_vectors < 39 * (1 << pq_bits):
+        pq_bits -= 1
+
+    quantizer = faiss.IndexFlatL2(dim)
+    index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_bits)
+    index.train(vectors)
+    index.nprobe = min(nprobe, nlist)
+    return index
+
+
+def index_memory_bytes(index):
+    """Approximate in-memory size of an index, via its serialized form."""
+    return faiss.serialize_index(index).nbytes
+
+
+def build_vector_store(texts, embeddings, index_type=None):
+    """
+    Embeds texts and wraps a configurable FAISS index in a LangChain vector store.
+    index_type defaults to the VECTOR_INDEX_TYPE env var, then "auto".
+    """
+    if index_type is None:
+        index_type = os.getenv("VECTOR_INDEX_TYPE", "auto")
+
+    vectors = embeddings.embed_documents(texts)
+    index = build_faiss_index(vectors, index_type=index_type)
+
+    vector_store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    vector_store.add_embeddings(list(zip(texts, vectors)))
+    print(f"✅ Built {type(index).__name__} over {len(texts)} chunks "
+          f"({index_memory_bytes(index) / 1e6:.1f} MB)")
+    return vector_store
@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ComponentNotReady(Exception):
+    """Raised when a component is requested before it has finished loading."""
+
+
+class WarmupManager:
+    """
+    Loads heavy components (vector store, models, clients) in background
+    threads, in parallel, so the server can bind its port immediately.
+    A loader may call get() on another component to wait for it.
+    """
+
+    PENDING = "pending"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self._loaders = {}
+        self._components = {}
+        self._states = {}
+        self._errors = {}
+        self._timings = {}
+        self._events = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def register(self, name, loader):
+        """Register a zero-argument callable that builds the named component."""
+        self._loaders[name] = loader
+        self._states[name] = self.PENDING
+        self._events[name] = threading.Event()
+
+    def start(self):
+        """Start loading every registered component in the background."""
+        if self._executor is not None:
+            return
+        # One thread per component so loaders blocking on dependencies can't deadlock
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self._loaders)), thread_name_prefix="warmup"
+        )
+        for name in self._loaders:
+            self._executor.submit(self._load, name)
+
+    def _load(self, name):
+        with self._lock:
+            self._states[name] = self.LOADING
+        start = time.perf_counter()
+        try:
+            component = self._loaders[name]()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._components[name] = component
+                self._states[name] = self.READY
+                self._timings[name] = elapsed
+            print(f"✅ Warm-up: {name} ready in {elapsed:.2f}s")
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._states[name] = self.FAILED
+                self._errors[name] = str(e)
+                self._timings[name] = elapsed
+            print(f"⚠️ Warm-up: {name} failed after {elapsed:.2f}s: {str(e)}")
+        finally:
+            self._events[name].set()
+
+    def get(self, name, timeout=None):
+        """
+        Returns the named component, waiting up to timeout seconds for it.
+        Raises ComponentNotReady if it is still loading or failed to load.
+        """
+        self._events[name].wait(timeout)
+        with self._lock:
+            if self._states[name] == self.READY:
+                return self._components[name]
+            if self._states[name] == self.FAILED:
+                raise ComponentNotReady(f"{name} failed to load: {self._errors[name]}")
+        raise ComponentNotReady(f"{name} is still loading")
+
+    def is_ready(self, name=None):
+        with self._lock:
+            if name is not None:
+                return self._states.get(name) == self.READY
+            return all(state == self.READY for state in self._states.values())
+
+    def status(self):
+        """Per-component state, load time and error, for the /ready endpoint."""
+        with self._lock:
+            return {
+                name: {
+                    "state": self._states[name],
+                    "seconds": round(self._timings[name], 3) if name in self._timings else None,
+                    "error": self._errors.get(name),
+                }
+                for name in self._loaders
+            }
@@ -0,0 +1,45 @@
+"""
+Reports per-worker memory of a running multi-worker server.
+
+RSS counts shared pages (mmapped index, page cache) in every worker, so it
+overstates the real cost. PSS splits shared pages between the processes that
+map them and USS is memory private to one worker; USS is the per-worker
+overhead that grows with the number of workers.
+
+Usage:
+    uvicorn main:app --workers 4 &
+    python worker_memory.py <master pid>
+"""
+import sys
+import psutil
+
+
+def worker_memory(master_pid):
+    master = psutil.Process(master_pid)
+    rows = []
+    for proc in [master] + master.children(recursive=True):
+        info = proc.memory_full_info()
+        rows.append({
+            "pid": proc.pid,
+            "role": "master" if proc.pid == master_pid else "worker",
+            "rss_mb": info.rss / 1e6,
+            "pss_mb": getattr(info, "pss", 0) / 1e6,
+            "uss_mb": getattr(info, "uss", 0) / 1e6,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip())
+        sys.exit(1)
+
+    rows = worker_memory(int(sys.argv[1]))
+    print(f"{'pid':>8}  {'role':<8}{'rss (MB)':>10}{'pss (MB)':>10}{'uss (MB)':>10}")
+    for row in rows:
+        print(f"{row['pid']:>8}  {row['role']:<8}{row['rss_mb']:>10.1f}{row['pss_mb']:>10.1f}{row['uss_mb']:>10.1f}")
+
+    workers = [r for r in rows if r["role"] == "worker"]
+    if workers:
+        print(f"\nTotal PSS: {sum(r['pss_mb'] for r in rows):.1f} MB, "
+              f"mean worker USS: {sum(r['uss_mb'] for r in workers) / len(workers):.1f} MB")